@@ -0,0 +1,286 @@
+import os
+import pickle
+import tempfile
+import unittest
+from unittest import mock
+import train_main
+from train_main import AddressBook, Record
+def make_book(*names):
+    book = AddressBook()
+    for name in names:
+        record = Record(name)
+        record.add_phone("1234567890")
+        book.add_record(record)
+    return book
+def states(book):
+    return [record.__getstate__() for record in book.data.values()]
+CALLS = []
+def record_call():
+    CALLS.append("ran")
+class Exploit:
+    """Unpickles as a call to record_call, as a crafted file would call os.system"""
+    def __reduce__(self):
+        return (record_call, ())
+def reload(filename):
+    book = AddressBook()
+    book.load_from_file(filename)
+    return book
+class JournalTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.filename = os.path.join(self._dir.name, "book.pkl")
+        self.journal = self.filename + train_main._JOURNAL_SUFFIX
+    def assertReloads(self, book):
+        self.assertEqual(states(reload(self.filename)), states(book))
+    def test_journalled_edit_keeps_book_order(self):
+        book = make_book("A", "B", "C")
+        book.save_to_file(self.filename)
+        book.find("A").add_notes("call back")
+        book.save_to_file(self.filename)
+        self.assertTrue(os.path.exists(self.journal))
+        self.assertEqual(list(reload(self.filename).data), ["A", "B", "C"])
+        self.assertReloads(book)
+    def test_delete(self):
+        book = make_book("A", "B", "C")
+        book.save_to_file(self.filename)
+        book.delete_contact("B")
+        book.save_to_file(self.filename)
+        self.assertEqual(list(reload(self.filename).data), ["A", "C"])
+        self.assertReloads(book)
+    def test_deleted_and_added_again_goes_to_the_end(self):
+        book = make_book("A", "B", "C")
+        book.save_to_file(self.filename)
+        book.delete_contact("A")
+        book.add_record(Record("D"))
+        book.add_record(Record("A"))
+        book.save_to_file(self.filename)
+        self.assertEqual(list(book.data), ["B", "C", "D", "A"])
+        self.assertReloads(book)
+    def test_rename(self):
+        book = make_book("A", "B", "C")
+        book.save_to_file(self.filename)
+        book.rename_contact("A", "Z")
+        book.rename_contact("C", "B")
+        book.save_to_file(self.filename)
+        self.assertEqual(list(book.data), ["B", "Z"])
+        self.assertReloads(book)
+    def test_truncated_last_frame(self):
+        book = make_book("A", "B")
+        book.save_to_file(self.filename)
+        book.find("A").add_notes("first")
+        book.save_to_file(self.filename)
+        book.find("B").add_notes("second")
+        book.save_to_file(self.filename)
+        with open(self.journal, "rb+") as file:
+            file.truncate(os.path.getsize(self.journal) - 1)
+        loaded = reload(self.filename)
+        self.assertEqual(loaded.find("A").notes, "first")
+        self.assertIsNone(loaded.find("B").notes)
+        # the damaged journal is replaced by a full snapshot on the next save
+        loaded.save_to_file(self.filename)
+        self.assertFalse(os.path.exists(self.journal))
+        self.assertReloads(loaded)
+    def test_compaction_at_journal_limit(self):
+        book = make_book("A", "B", "C")
+        book.save_to_file(self.filename)
+        with mock.patch.object(train_main, "_JOURNAL_LIMIT", 2):
+            book.find("A").add_notes("one")
+            book.find("B").add_notes("two")
+            book.save_to_file(self.filename)
+            self.assertTrue(os.path.exists(self.journal))
+            self.assertEqual(book._journal_entries, 2)
+            book.find("C").add_notes("three")
+            book.save_to_file(self.filename)
+            self.assertFalse(os.path.exists(self.journal))
+            self.assertEqual(book._journal_entries, 0)
+        self.assertReloads(book)
+    def test_damaged_frames_are_dropped_before_the_book_changes(self):
+        # (changed, appended) written with the book's generation after a good frame
+        for damage in (((("A", ("A", [], None)),), ()),  # state of the wrong shape
+                       ((("B", ("B", [], None, None, None, None, [])),), ([], "x")),  # appended not (name, state) pairs
+                       (((["A"], None),), ()),  # unhashable name
+                       ((), (("C", ("C", [], ["list"], None, None, None, [])),))):  # unhashable email
+            with self.subTest(damage=damage):
+                book = make_book("A", "B")
+                book.save_to_file(self.filename)
+                book.find("A").add_notes("kept")
+                book.save_to_file(self.filename)
+                frame = (book._generation,) + damage
+                with open(self.journal, "ab") as file:
+                    file.write(pickle.dumps(frame))
+                loaded = reload(self.filename)
+                self.assertEqual(list(loaded.data), ["A", "B"])
+                self.assertEqual(loaded.find("A").notes, "kept")
+                self.assertIsNone(loaded.find("B").notes)
+                self.assertIsNone(loaded._snapshot_file)
+    def test_garbage_frame_bytes(self):
+        for garbage in (b"\x80\x05\x95\xff\xff", b"\x8c\x02\xff\xfe.", b"J\xff\xff\xff\x7f\x94\x8c.", b"not a pickle"):
+            with self.subTest(garbage=garbage):
+                book = make_book("A")
+                book.save_to_file(self.filename)
+                with open(self.journal, "wb") as file:
+                    file.write(garbage)
+                self.assertEqual(list(reload(self.filename).data), ["A"])
+    def test_bad_snapshot_state_leaves_the_book_as_it_was(self):
+        book = make_book("KEEP")
+        with open(self.filename, "wb") as file:
+            file.write(pickle.dumps((b"gen", (("A", [], None),))))
+        with self.assertRaisesRegex(ValueError, "Unsupported address book file."):
+            book.load_from_file(self.filename)
+        self.assertEqual(list(book.data), ["KEEP"])
+    def test_journal_refuses_globals(self):
+        CALLS.clear()
+        book = make_book("A")
+        book.save_to_file(self.filename)
+        with open(self.journal, "ab") as file:
+            file.write(pickle.dumps((book._generation, ((Exploit(), None),), ())))
+        self.assertEqual(list(reload(self.filename).data), ["A"])
+        self.assertEqual(CALLS, [])
+    def test_missing_snapshot_is_written_again(self):
+        for touched in (True, False):
+            with self.subTest(touched=touched):
+                book = make_book("A", "B")
+                book.save_to_file(self.filename)
+                os.remove(self.filename)
+                if touched:
+                    book.find("A").add_notes("after the move")
+                book.save_to_file(self.filename)
+                self.assertFalse(os.path.exists(self.journal))
+                self.assertReloads(book)
+    def test_stale_journal_after_interrupted_compaction(self):
+        book = make_book("A", "B")
+        book.save_to_file(self.filename)
+        book.find("A").add_notes("old")
+        book.save_to_file(self.filename)
+        book.find("A").add_notes("new")
+        # compaction stops after the snapshot is replaced but before the journal is removed
+        book._snapshot_file = None
+        with mock.patch.object(train_main.os, "remove", side_effect=SystemExit):
+            with self.assertRaises(SystemExit):
+                book.save_to_file(self.filename)
+        self.assertTrue(os.path.exists(self.journal))
+        loaded = reload(self.filename)
+        self.assertEqual(loaded.find("A").notes, "new")
+        self.assertIsNone(loaded._snapshot_file)
+# self.data of John and Ann as pickled by the first release, run as a script
+FIRST_RELEASE_BOOK = (
+    b'\x80\x04\x95\x83\x01\x00\x00\x00\x00\x00\x00}\x94(\x8c\x04John\x94\x8c\x08__main__\x94\x8c\x06Re'
+    b'cord\x94\x93\x94)\x81\x94}\x94(\x8c\x04name\x94h\x02\x8c\x04Name\x94\x93\x94)\x81\x94}\x94\x8c'
+    b'\x05value\x94h\x01sb\x8c\x06phones\x94]\x94(h\x02\x8c\x05Phone\x94\x93\x94)\x81\x94}\x94h\x0c'
+    b'\x8c\n1234567890\x94sbh\x10)\x81\x94}\x94h\x0c\x8c\n0987654321\x94sbe\x8c\x05email\x94h\x02\x8c'
+    b'\x05Email\x94\x93\x94)\x81\x94}\x94h\x0c\x8c\x10john@example.com\x94sb\x8c\x07address\x94h\x02'
+    b'\x8c\x07Address\x94\x93\x94)\x81\x94}\x94h\x0c\x8c\tMain St 1\x94sb\x8c\x08birthday\x94h\x02\x8c'
+    b'\x08Birthday\x94\x93\x94)\x81\x94}\x94h\x0c\x8c\n01.02.1990\x94sb\x8c\x05notes\x94\x8c\tcall bac'
+    b'k\x94\x8c\x04tags\x94]\x94(\x8c\x06friend\x94\x8c\x04work\x94eub\x8c\x03Ann\x94h\x04)\x81\x94}'
+    b'\x94(h\x07h\t)\x81\x94}\x94h\x0ch/sbh\r]\x94h\x17Nh\x1dNh#Nh)Nh+]\x94ubu.')
+class FirstReleaseTest(unittest.TestCase):
+    def setUp(self):
+        self._dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self._dir.cleanup)
+        self.filename = os.path.join(self._dir.name, "book.pkl")
+    def write(self, payload):
+        with open(self.filename, "wb") as file:
+            file.write(payload)
+    def test_loads_first_release_book(self):
+        self.write(FIRST_RELEASE_BOOK)
+        book = reload(self.filename)
+        self.assertEqual(list(book.data), ["John", "Ann"])
+        self.assertEqual(book.find("John").__getstate__(),
+                         ("John", ["1234567890", "0987654321"], "john@example.com", "Main St 1",
+                          "01.02.1990", "call back", ["friend", "work"]))
+        self.assertEqual(book.find_by_phone("0987654321").name, "John")
+        # the next save rewrites the book in the current format
+        self.assertIsNone(book._snapshot_file)
+        book.find("Ann").add_tag("new")
+        book.save_to_file(self.filename)
+        self.assertEqual(states(reload(self.filename)), states(book))
+    def test_refuses_other_globals(self):
+        CALLS.clear()
+        book = make_book("A")
+        self.write(pickle.dumps({"x": Exploit()}))
+        with self.assertRaisesRegex(ValueError, "Unsupported address book file."):
+            book.load_from_file(self.filename)
+        self.assertEqual(CALLS, [])
+        self.assertEqual(list(book.data), ["A"])
+    def test_unsupported_file(self):
+        book = make_book("A")
+        self.write(b"not a pickle")
+        with self.assertRaisesRegex(ValueError, "Unsupported address book file."):
+            book.load_from_file(self.filename)
+        self.assertEqual(list(book.data), ["A"])
+class LookupOrderTest(unittest.TestCase):
+    def test_search_by_tag_follows_book_order(self):
+        book = make_book("A", "B")
+        book.find("B").add_tag("friend")
+        book.find("A").add_tag("friend")
+        self.assertEqual([record.name for record in book.search_by_tag("friend")], ["A", "B"])
+    def test_find_by_phone_returns_first_in_book_order(self):
+        book = make_book("A", "B")
+        book.find("A").remove_phone("1234567890")
+        book.find("A").add_phone("1234567890")
+        self.assertEqual(book.find_by_phone("1234567890").name, "A")
+class ParseInputTest(unittest.TestCase):
+    def test_double_quotes_group_words(self):
+        self.assertEqual(train_main.parse_input('add-notes John "call back later"'),
+                         ("add-notes", ["John", "call back later"]))
+    def test_apostrophe_next_to_double_quotes(self):
+        self.assertEqual(train_main.parse_input('add-notes O\'Brien "call back later"'),
+                         ("add-notes", ["O'Brien", "call back later"]))
+    def test_backslash_and_hash_kept(self):
+        self.assertEqual(train_main.parse_input('add-notes x\\y "#1 \\n"'), ("add-notes", ["x\\y", "#1 \\n"]))
+    def test_unbalanced_quote_is_an_ordinary_character(self):
+        self.assertEqual(train_main.parse_input('add-notes John "late'), ("add-notes", ["John", '"late']))
+class EmailTest(unittest.TestCase):
+    def test_accepts(self):
+        for value in ("john@example.com", "j.doe+tag@mail.example.co.uk", "a@b.c"):
+            with self.subTest(value=value):
+                self.assertEqual(train_main.Email(value).value, value)
+    def test_rejects(self):
+        for value in ("john", "@example.com", "john@example", "john@@example.com", "a@b@c.com",
+                      "john@.com", "john@example.", ""):
+            with self.subTest(value=value):
+                with self.assertRaisesRegex(ValueError, "Invalid email format."):
+                    train_main.Email(value)
+class BirthdayTest(unittest.TestCase):
+    def test_accepts(self):
+        for value, date in (("01.02.1990", (1990, 2, 1)), ("1.2.1990", (1990, 2, 1)), ("29.02.2000", (2000, 2, 29))):
+            with self.subTest(value=value):
+                birthday = train_main.Birthday(value)
+                self.assertEqual(birthday.date, train_main.date(*date))
+                self.assertEqual((birthday.month, birthday.day), date[1:])
+                self.assertEqual(birthday.value, value)
+    def test_rejects(self):
+        for value in ("29.02.2001", "32.01.1990", "01.13.1990", "00.01.1990", "1990-01-01", "01.01.90",
+                      "001.01.1990", "01.01.1990.", " 1.01.1990", "+1.01.1990", "\u0661.01.1990", ""):
+            with self.subTest(value=value):
+                with self.assertRaisesRegex(ValueError, "DD.MM.YYYY"):
+                    train_main.Birthday(value)
+def fake_today(year, month, day):
+    class FakeDate(train_main.date):
+        @classmethod
+        def today(cls):
+            return cls(year, month, day)
+    return mock.patch.object(train_main, "date", FakeDate)
+class BirthdaysPerWeekTest(unittest.TestCase):
+    def upcoming(self, today, *birthdays):
+        book = AddressBook()
+        for birthday in birthdays:
+            record = Record(birthday)
+            record.add_birthday(birthday)
+            book.add_record(record)
+        with fake_today(*today):
+            return book.get_birthdays_per_week()
+    def test_week_over_new_year(self):
+        self.assertEqual(self.upcoming((2023, 12, 29), "05.01.1990", "01.01.1990", "28.12.1990", "31.12.1990",
+                                       "04.01.1990", "29.12.1990"),
+                         ["29.12.1990", "31.12.1990", "01.01.1990", "04.01.1990"])
+    def test_29_february_on_28th_in_non_leap_year(self):
+        self.assertEqual(self.upcoming((2023, 2, 22), "21.02.1990", "22.02.1990", "29.02.2000", "01.03.1990"),
+                         ["22.02.1990", "29.02.2000"])
+    def test_29_february_in_leap_year(self):
+        self.assertEqual(self.upcoming((2024, 2, 22), "28.02.1990", "29.02.2000", "01.03.1990"), ["28.02.1990"])
+        self.assertEqual(self.upcoming((2024, 2, 24), "28.02.1990", "29.02.2000", "01.03.1990"),
+                         ["28.02.1990", "29.02.2000", "01.03.1990"])
+if __name__ == "__main__":
+    unittest.main()
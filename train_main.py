@@ -1,120 +1,377 @@
-import pickle
-import re
-from datetime import datetime, timedelta
-from rich.console import Console
-from rich.table import Table
-console = Console()
+import io
+import os
+import sys
+from bisect import bisect_left, bisect_right
+from datetime import date
+from operator import attrgetter
+_console = None  # rich is imported and the Console created on first output, see get_console
+_NOT_SPECIFIED = "Not specified"
+_JOURNAL_SUFFIX = ".journal"
+_TEMP_SUFFIX = ".tmp"  # a new snapshot is written here, then moved over the old one
+_JOURNAL_LIMIT = 1000  # journalled record states before a save compacts them into a new snapshot
 class Field:
+    __slots__ = ("value",)
     def __init__(self, value):
         self.value = value
     def __str__(self):
         return str(self.value)
-class Name(Field):
-    pass
 class Phone(Field):
+    __slots__ = ()
     def __init__(self, value):
-        if not value.isdigit() or len(value) != 10:
+        # isascii() keeps out non-ASCII digits such as '²' that isdigit() accepts
+        if len(value) != 10 or not value.isascii() or not value.isdecimal():
             raise ValueError("Invalid phone number format. It should contain 10 digits.")
         super().__init__(value)
 class Email(Field):
+    __slots__ = ()
     def __init__(self, value):
-        if not re.match(r"[^@]+@[^@]+\.[^@]+", value):
+        # One '@' with a non-empty local part, and a dot inside the domain
+        parts = value.split('@')
+        if len(parts) != 2 or not parts[0] or '.' not in parts[1] or parts[1].startswith('.') or parts[1].endswith('.'):
             raise ValueError("Invalid email format.")
         super().__init__(value)
-class Address(Field):
-    pass
 class Birthday(Field):
+    __slots__ = ("date", "month", "day")
     def __init__(self, value):
+        # DD.MM.YYYY split by hand; strptime re-reads its format string on every call
+        parts = value.split('.')
         try:
-            datetime.strptime(value, '%d.%m.%Y')
+            if (len(parts) != 3 or len(parts[0]) > 2 or len(parts[1]) > 2 or len(parts[2]) != 4
+                    or not all(part.isascii() and part.isdigit() for part in parts)):
+                raise ValueError
+            self.date = date(int(parts[2]), int(parts[1]), int(parts[0]))
         except ValueError:
             raise ValueError("Invalid birthday format. It should be in DD.MM.YYYY format.")
+        self.month, self.day = self.date.month, self.date.day
         super().__init__(value)
 class Record:
+    __slots__ = ("name", "phones", "email", "address", "birthday", "notes", "tags", "_book", "_position", "_strings", "_rendered")
     def __init__(self, name):
-        self.name = Name(name)
-        self.phones = []
-        self.email = None # Added field for email
+        # Names and tags are interned: tags repeat across contacts, and both serve as dict keys
+        self.name = sys.intern(name)
+        self.phones = {}  # validated numbers as an insertion-ordered set (values unused)
+        self.email = None # Added field for email, kept as the validated string
         self.address = None # Added address field
         self.birthday = None
         self.notes = None # Added field for text notes
-        self.tags = []  # Added field for tags
+        self.tags = set()  # Added field for tags
+        self._book = None  # AddressBook holding this record, kept in sync by add_record
+        self._position = 0  # rank in the book's insertion order, set by add_record
+        self._strings = None  # cached display strings, cleared by _changed
+        self._rendered = None  # cached __str__ output, cleared by _changed
+    def _changed(self):
+        self._strings = None
+        self._rendered = None
+        if self._book:
+            self._book._changed(self)
     def add_phone(self, phone):
-        self.phones.append(Phone(phone))
+        self.phones[Phone(phone).value] = None
+        if self._book:
+            self._book._index_phone(self, phone)
+        self._changed()
     def add_email(self, email):
-        self.email = Email(email)
+        self._set_email(Email(email).value)
+    def _set_email(self, email):
+        if self._book and self.email:
+            self._book._unindex_email(self, self.email)
+        self.email = email
+        if self._book and email:
+            self._book._index_email(self, email)
+        self._changed()
     def add_address(self, address):
-        self.address = Address(address)
+        self.address = address
+        self._changed()
     def add_birthday(self, birthday):
-        self.birthday = Birthday(birthday)
+        self._set_birthday(Birthday(birthday))
+    def _set_birthday(self, birthday):
+        if self._book:
+            self._book._unindex_birthday(self)
+        self.birthday = birthday
+        if self._book:
+            self._book._index_birthday(self)
+        self._changed()
     def add_notes(self, notes):
         self.notes = notes
+        self._changed()
     def add_tag(self, tag):
-        self.tags.append(tag)
+        tag = sys.intern(tag)
+        self.tags.add(tag)
+        if self._book:
+            self._book._index_tag(self, tag)
+        self._changed()
     def edit_email(self, new_email):
-        self.email = Email(new_email)
+        self._set_email(Email(new_email).value)
     def edit_name(self, new_name):
-        self.name = Name(new_name)
+        self.name = sys.intern(new_name)
+        self._changed()
     def edit_address(self, new_address):
-        self.address = Address(new_address)
+        self.address = new_address
+        self._changed()
     def edit_birthday(self, new_birthday):
-        self.birthday = Birthday(new_birthday)    
+        self._set_birthday(Birthday(new_birthday))
     def show_tags(self):
-        return ', '.join(self.tags) if self.tags else "No tags"
+        return ', '.join(sorted(self.tags)) if self.tags else "No tags"
     def remove_phone(self, phone):
-        self.phones = [p for p in self.phones if str(p) != phone]
+        if phone in self.phones:
+            del self.phones[phone]
+            if self._book:
+                self._book._unindex_phone(self, phone)
+        self._changed()
     def edit_phone(self, old_phone, new_phone):
+        Phone(new_phone)  # validate before dropping the old number
         self.remove_phone(old_phone)
         self.add_phone(new_phone)
     def find_phone(self, phone):
-        for p in self.phones:
-            if str(p) == phone:
-                return p
-        return None
+        return phone if phone in self.phones else None
     def show_notes(self):
         return str(self.notes) if self.notes else "No notes"
     def remove_email(self):
-        self.email = None
+        self._set_email(None)
     def remove_address(self):
         self.address = None
+        self._changed()
     def remove_birthday(self):
-        self.birthday = None
+        self._set_birthday(None)
     def remove_tag(self, tag):
         if tag in self.tags:
-            self.tags.remove(tag)
+            self.tags.discard(tag)
+            if self._book:
+                self._book._unindex_tag(self, tag)
+            self._changed()
     def remove_all_tags(self):
-        self.tags = []
+        if self._book:
+            for tag in self.tags:
+                self._book._unindex_tag(self, tag)
+        self.tags.clear()
+        self._changed()
+    def __getstate__(self):
+        # Plain strings only: no Field objects or class references per contact
+        return (self.name,
+                list(self.phones),
+                self.email,
+                self.address,
+                self.birthday.value if self.birthday else None,
+                self.notes,
+                sorted(self.tags))
+    def __setstate__(self, state):
+        """Restores a saved record without re-running the phone and email validators"""
+        name, phones, email, address, birthday, notes, tags = state
+        self.name = sys.intern(name)
+        self.phones = dict.fromkeys(phones)
+        self.email = email
+        self.address = address
+        self.birthday = Birthday(birthday) if birthday else None  # parsed again for its cached date
+        self.notes = notes
+        self.tags = {sys.intern(tag) for tag in tags}
+        self._book = None  # re-attached by AddressBook.add_record
+        self._position = 0
+        self._strings = None
+        self._rendered = None
+    def _display(self):
+        """Returns the display string of every column, rebuilt only after the record changes"""
+        if self._strings is None:
+            self._strings = (
+                self.name,
+                '; '.join(self.phones),
+                self.email if self.email else _NOT_SPECIFIED,
+                self.address if self.address else _NOT_SPECIFIED,
+                self.birthday.value if self.birthday else _NOT_SPECIFIED,
+                self.show_notes(),
+                self.show_tags(),
+            )
+        return self._strings
+    def _render(self):
+        if self._rendered is None:
+            self._rendered = "Contact name: %s, phones: %s, email: %s, address: %s, birthday: %s, notes: %s, tags: %s" % self._display()
+        return self._rendered
     def __str__(self):
-        phones_str = '; '.join(str(p) for p in self.phones)
-        email_str = str(self.email) if self.email else "Not specified"
-        address_str = str(self.address) if self.address else "Not specified"
-        birthday_str = str(self.birthday) if self.birthday else "Not specified"
-        notes_str = self.show_notes()
-        tags_str = self.show_tags()
-        return f"Contact name: {self.name.value}, phones: {phones_str}, email: {email_str}, address: {address_str}, birthday: {birthday_str}, notes: {notes_str}, tags: {tags_str}"
+        return self._render()
+class _Legacy:
+    """Takes the attributes of a Field or Record object from a book saved by the first release"""
+_LEGACY_CLASSES = frozenset(("Field", "Name", "Phone", "Email", "Address", "Birthday", "Record"))
+def _legacy_state(record):
+    """Converts a first-release Record, whose fields are Field objects, to the tuple __getstate__ returns"""
+    fields = record.__dict__
+    def value(key):
+        field = fields.get(key)
+        return field.value if field is not None else None
+    return (fields["name"].value,
+            [phone.value for phone in fields.get("phones", ())],
+            value("email"),
+            value("address"),
+            value("birthday"),
+            fields.get("notes"),
+            list(fields.get("tags", ())))
+_BookUnpickler = None  # pickle.Unpickler subclass, created by _book_unpickler on first load
+def _book_unpickler(file):
+    """Returns an unpickler for book and journal files that loads the first release's Field and
+    Record classes as _Legacy and refuses every other global, so a crafted file cannot run code"""
+    global _BookUnpickler
+    if _BookUnpickler is None:
+        import pickle
+        class BookUnpickler(pickle.Unpickler):
+            def find_class(self, module, name):
+                # Books now hold only strings and tuples; these names can only come from the first release
+                if name in _LEGACY_CLASSES:
+                    return _Legacy
+                raise pickle.UnpicklingError(f"{module}.{name} is not allowed in an address book file")
+        _BookUnpickler = BookUnpickler
+    return _BookUnpickler(file)
+# Raised, besides pickle.UnpicklingError, by damaged or foreign bytes or states of the wrong shape
+_DAMAGED_FILE_ERRORS = (EOFError, AttributeError, ImportError, IndexError, KeyError, OverflowError, TypeError, ValueError)
+def _restore_record(state):
+    record = Record.__new__(Record)
+    record.__setstate__(state)
+    if record.email is not None and not isinstance(record.email, str):  # indexed, so it has to hash
+        raise TypeError("email must be a string")
+    return record
+def _unpickle_book(payload):
+    """Decodes a saved book in the current or the first release's format into (generation, records)"""
+    import pickle
+    try:
+        data = _book_unpickler(io.BytesIO(payload)).load()
+        if isinstance(data, dict):  # the first release pickled self.data: name -> Record
+            return None, [_restore_record(_legacy_state(record)) for record in data.values()]
+        generation, states = data
+        return generation, [_restore_record(state) for state in states]
+    except (pickle.UnpicklingError, *_DAMAGED_FILE_ERRORS):
+        raise ValueError("Unsupported address book file.")
+def _read_journal(filename, generation):
+    """Decodes the journal saved next to a snapshot into (changed, appended) frames of restored
+    records; the flag returned with them is False if a frame was damaged or stale"""
+    try:
+        with open(filename + _JOURNAL_SUFFIX, 'rb') as file:
+            payload = file.read()
+    except FileNotFoundError:
+        return [], True
+    import pickle
+    journal = io.BytesIO(payload)
+    frames = []
+    intact = True
+    while journal.tell() < len(payload):
+        try:
+            frame_generation, changed, appended = _book_unpickler(journal).load()
+            if frame_generation != generation:  # left by a compaction that crashed before removing it
+                intact = False
+                continue
+            # sys.intern also rejects names that are not strings
+            frames.append((tuple((sys.intern(name), _restore_record(state) if state is not None else None)
+                                 for name, state in changed),
+                           tuple((sys.intern(name), _restore_record(state)) for name, state in appended)))
+        except (pickle.UnpicklingError, *_DAMAGED_FILE_ERRORS):
+            return frames, False  # a save interrupted mid-write leaves a truncated last frame
+    return frames, intact
+_book_order = attrgetter("_position")  # sort key giving records in self.data order
+def _bucket_add(index, key, record):
+    index.setdefault(key, {})[record] = None
+def _bucket_discard(index, key, record):
+    bucket = index.get(key)
+    if bucket is not None:
+        bucket.pop(record, None)
+        if not bucket:
+            del index[key]
 class AddressBook:
     def __init__(self):
         self.data = {}
+        # tag, phone and email -> records holding it, as insertion-ordered dicts
+        self._tag_index = {}
+        self._phone_index = {}
+        self._email_index = {}
+        # Records with a birthday sorted by month * 100 + day, with the keys kept alongside for bisect
+        self._bday_keys = []
+        self._bday_records = []
+        self._all_table = None  # rich Table shown by the "all" command, dropped by _changed
+        self._next_position = 0
+        # Saving rewrites the snapshot file only on first save or when the journal grows
+        # past _JOURNAL_LIMIT; otherwise the names touched since the last save/load are appended
+        self._snapshot_file = None
+        self._generation = None  # token of the snapshot, repeated in each journal frame
+        self._journal_entries = 0
+        self._touched = {}
+        self._appended = {}  # names added to the end of self.data since the last save/load, in order
+    def _changed(self, record=None):
+        self._all_table = None
+        if record is not None:
+            self._touched[record.name] = None
     def add_record(self, record):
-        self.data[record.name.value] = record
+        replaced = self.data.get(record.name)
+        if replaced is None:  # a new key goes to the end of self.data
+            self._appended[record.name] = None
+            self._next_position += 1
+            record._position = self._next_position
+        elif replaced is not record:  # replacing keeps the old record's place
+            record._position = replaced._position
+            self._detach(replaced)
+        self.data[record.name] = record
+        self._changed(record)
+        if record._book is not self:  # a renamed record is already indexed
+            record._book = self
+            for tag in record.tags:
+                self._index_tag(record, tag)
+            for phone in record.phones:
+                self._index_phone(record, phone)
+            if record.email:
+                self._index_email(record, record.email)
+            self._index_birthday(record)
+    def _detach(self, record):
+        for tag in record.tags:
+            self._unindex_tag(record, tag)
+        for phone in record.phones:
+            self._unindex_phone(record, phone)
+        if record.email:
+            self._unindex_email(record, record.email)
+        self._unindex_birthday(record)
+        record._book = None
+        self._changed(record)
+    def _index_birthday(self, record):
+        if record.birthday:
+            key = record.birthday.month * 100 + record.birthday.day
+            position = bisect_right(self._bday_keys, key)
+            self._bday_keys.insert(position, key)
+            self._bday_records.insert(position, record)
+    def _unindex_birthday(self, record):
+        if record.birthday:
+            key = record.birthday.month * 100 + record.birthday.day
+            position = bisect_left(self._bday_keys, key)
+            while self._bday_records[position] is not record:
+                position += 1
+            del self._bday_keys[position]
+            del self._bday_records[position]
+    def _index_tag(self, record, tag):
+        _bucket_add(self._tag_index, tag, record)
+    def _unindex_tag(self, record, tag):
+        _bucket_discard(self._tag_index, tag, record)
+    def _index_phone(self, record, phone):
+        _bucket_add(self._phone_index, phone, record)
+    def _unindex_phone(self, record, phone):
+        _bucket_discard(self._phone_index, phone, record)
+    def _index_email(self, record, email):
+        _bucket_add(self._email_index, email, record)
+    def _unindex_email(self, record, email):
+        _bucket_discard(self._email_index, email, record)
     def find(self, name):
         return self.data.get(name)
 
     def find_by_phone(self, phone):
-        for record in self.data.values():
-            if any(str(p) == phone for p in record.phones):
-                return record
-        return None    
+        # The first holder in book order, as a scan over self.data would find
+        return min(self._phone_index.get(phone, ()), key=_book_order, default=None)
 
     def find_by_email(self, email):
-        for record in self.data.values():
-            if record.email and str(record.email) == email:
-                return record
-        return None
+        return min(self._email_index.get(email, ()), key=_book_order, default=None)
 
     def delete_contact(self, name):
-        if name in self.data:
-            del self.data[name]
+        record = self.data.pop(name, None)
+        if record is not None:
+            self._appended.pop(name, None)
+            self._detach(record)
+    def rename_contact(self, old_name, new_name):
+        record = self.data.pop(old_name, None)
+        if record is not None:
+            self._touched[old_name] = None
+            self._appended.pop(old_name, None)
+            record.edit_name(new_name)
+            self.add_record(record)
+        return record
     def delete_email(self, name):
         record = self.find(name)
         if record and record.email:
@@ -136,88 +393,150 @@ class AddressBook:
         if record:
             record.remove_all_tags()
     def get_birthdays_per_week(self):
-        today = datetime.now()
-        next_week = today + timedelta(days=7)
+        today = date.today()
+        last_day = date.fromordinal(today.toordinal() + 6)
+        first_key = today.month * 100 + today.day
+        last_key = last_day.month * 100 + last_day.day
+        if last_key == 228 and date.fromordinal(last_day.toordinal() + 1).month == 3:
+            last_key = 229  # 29 February birthdays fall on the 28th in non-leap years
+        if first_key <= last_key:
+            spans = [(first_key, last_key)]
+        else:  # the week runs over New Year
+            spans = [(first_key, 1231), (101, last_key)]
         upcoming_birthdays = []
-        for record in self.data.values():
-            if record.birthday:
-                birthday_date = datetime.strptime(str(record.birthday), '%d.%m.%Y')
-                if today <= birthday_date < next_week:
-                    upcoming_birthdays.append(record.name.value)
+        for low, high in spans:
+            start = bisect_left(self._bday_keys, low)
+            end = bisect_right(self._bday_keys, high)
+            upcoming_birthdays.extend(record.name for record in self._bday_records[start:end])
         return upcoming_birthdays
     def save_to_file(self, filename):
-        with open(filename, 'wb') as file:
-            pickle.dump(self.data, file)
+        import pickle  # deferred with rich: only needed once a book is saved or loaded
+        # A snapshot moved or deleted since the last save/load is written afresh, as the journal alone loads nothing
+        if (filename == self._snapshot_file and self._journal_entries + len(self._touched) <= _JOURNAL_LIMIT
+                and os.path.exists(filename)):
+            if self._touched:
+                # One frame per save, tagged with the snapshot generation it applies to. Names that keep
+                # their place carry their state, or None once deleted; names inserted since the last
+                # save are listed apart, in book order, since replaying them moves them to the end
+                changed = tuple((name, self.data[name].__getstate__() if name in self.data else None)
+                                for name in self._touched if name not in self._appended)
+                appended = tuple((name, self.data[name].__getstate__()) for name in self._appended)
+                frame = (self._generation, changed, appended)
+                with open(filename + _JOURNAL_SUFFIX, 'ab') as file:
+                    file.write(pickle.dumps(frame, protocol=pickle.HIGHEST_PROTOCOL))
+                self._journal_entries += len(changed) + len(appended)
+        else:
+            # (generation, record states): strings only, no class references. The new generation
+            # makes the old journal stale even if a crash stops it being removed, and the temp
+            # file keeps the old snapshot whole until the new one replaces it
+            generation = os.urandom(8)
+            states = tuple(record.__getstate__() for record in self.data.values())
+            payload = pickle.dumps((generation, states), protocol=pickle.HIGHEST_PROTOCOL)
+            with open(filename + _TEMP_SUFFIX, 'wb') as file:
+                file.write(payload)
+            os.replace(filename + _TEMP_SUFFIX, filename)
+            try:
+                os.remove(filename + _JOURNAL_SUFFIX)
+            except FileNotFoundError:
+                pass
+            self._snapshot_file = filename
+            self._generation = generation
+            self._journal_entries = 0
+        self._touched = {}
+        self._appended = {}
     def load_from_file(self, filename):
+        # Snapshot and journal are decoded in full before self.data is touched,
+        # so a damaged or foreign file leaves the book as it was
         try:
             with open(filename, 'rb') as file:
-                self.data = pickle.load(file)
+                payload = file.read()
         except FileNotFoundError:
-            self.data = {}
+            generation, records = None, []
+            snapshot_file = None
+        else:
+            generation, records = _unpickle_book(payload)
+            # A first-release book has no generation to journal against, so the next save rewrites it
+            snapshot_file = filename if generation is not None else None
+        frames, intact = _read_journal(filename, generation) if snapshot_file else ([], True)
+        self.data = {}
+        self._tag_index = {}
+        self._phone_index = {}
+        self._email_index = {}
+        self._bday_keys = []
+        self._bday_records = []
+        self._changed()
+        for record in records:
+            self.add_record(record)
+        replayed = 0
+        for changed, appended in frames:
+            for name, record in changed:
+                if record is None:
+                    self.delete_contact(name)
+                else:
+                    self.add_record(record)  # takes the replaced record's place
+            for name, record in appended:
+                self.delete_contact(name)
+                self.add_record(record)
+            replayed += len(changed) + len(appended)
+        if not intact:  # damaged or stale journal: the next save writes a fresh snapshot instead
+            snapshot_file, replayed = None, 0
+        self._generation = generation
+        self._snapshot_file = snapshot_file
+        self._journal_entries = replayed
+        self._touched = {}
+        self._appended = {}
     def search_by_tag(self, tag):
-        matching_records = [record for record in self.data.values() if tag in record.tags]
-        return matching_records
+        # Buckets are in tagging order; sorting by position gives book order
+        return sorted(self._tag_index.get(tag, ()), key=_book_order)
     def sort_by_tags(self, tag):
-        sorted_records = sorted(self.data.values(), key=lambda record: tag in record.tags)
-        return sorted_records
-def input_error(func):
-    def inner(*args, **kwargs):
-        try:
-            return func(*args, **kwargs)
-        except ValueError as e:
-            return str(e)
-        except KeyError:
-            return "Contact not found."
-        except IndexError:
-            return "Invalid command or missing argument."
-    return inner
-@input_error
+        # Untagged records first, then tagged ones, each in book order - the
+        # same order a stable sort on `tag in record.tags` gives, in one pass
+        tagged = self._tag_index.get(tag)
+        if not tagged:
+            return list(self.data.values())
+        untagged_records = []
+        tagged_records = []
+        for record in self.data.values():
+            (tagged_records if record in tagged else untagged_records).append(record)
+        return untagged_records + tagged_records
 def add_contact_command(args, book):
     name, phone = args
     record = Record(name)
     record.add_phone(phone)
     book.add_record(record)
     return "Contact added."
-@input_error
 def change_contact_command(args, book):
     name, phone = args
     record = book.find(name)
     if record:
-        record.edit_phone(record.phones[0], phone)  # Assume that the contact has only one phone
+        record.edit_phone(next(iter(record.phones), None), phone)  # Assume that the contact has only one phone
         return "Contact updated."
     else:
         return "Contact not found."
-@input_error
 def delete_contact_command(args, book):
     name = args[0]
     book.delete_contact(name)
     return f"Contact '{name}' deleted."
-@input_error
 def delete_email_command(args, book):
     name = args[0]
     book.delete_email(name)
     return f"Email for contact '{name}' deleted."
-@input_error
 def delete_address_command(args, book):
     name = args[0]
     book.delete_address(name)
     return f"Address for contact '{name}' deleted."
-@input_error
 def delete_phone_command(args, book):
     name, phone = args
     book.delete_phone(name, phone)
     return f"Phone number '{phone}' for contact '{name}' deleted."
-@input_error
 def delete_birthday_command(args, book):
     name = args[0]
     book.delete_birthday(name)
     return f"Birthday for contact '{name}' deleted."
-@input_error
 def delete_all_tags_command(args, book):
     name = args[0]
     book.delete_all_tags(name)
     return f"All tags for contact '{name}' deleted."
-@input_error
 def change_email_command(args, book):
     name, new_email = args
     record = book.find(name)
@@ -230,17 +549,11 @@ def change_email_command(args, book):
             return "Email added."
     else:
         return "Contact not found."
-@input_error
 def change_name_command(args, book):
     old_name, new_name = args
-    record = book.find(old_name)
-    if record:
-        record.edit_name(new_name)
-        book.data[new_name] = book.data.pop(old_name)
-        return "Name updated."
-    else:
+    if book.rename_contact(old_name, new_name) is None:
         return "Contact not found."
-@input_error
+    return "Name updated."
 def change_address_command(args, book):
     name, new_address = args
     record = book.find(name)
@@ -253,7 +566,6 @@ def change_address_command(args, book):
             return "Address added."
     else:
         return "Contact not found."
-@input_error
 def change_phone_command(args, book):
     name, old_phone, new_phone = args
     record = book.find(name)
@@ -266,51 +578,49 @@ def change_phone_command(args, book):
             return "Phone number added."
     else:
         return "Contact not found."
-@input_error
+def _record_lines(records):
+    """Groups one line per record so the whole listing goes through a single console.print"""
+    from rich.console import Group
+    from rich.text import Text
+    return Group(*[Text(record._render()) for record in records])
 def search_by_tag_command(args, book):
     tag = args[0]
     matching_records = book.search_by_tag(tag)
     if matching_records:
-        return "\n".join(str(record) for record in matching_records)
+        return _record_lines(matching_records)
     else:
         return "No contacts found with the specified tag."
-@input_error
 def sort_by_tags_command(args, book):
     tag = args[0]
     sorted_records = book.sort_by_tags(tag)
     if sorted_records:
-        return "\n".join(str(record) for record in sorted_records)
+        return _record_lines(sorted_records)
     else:
         return "No contacts found with the specified tag."
-@input_error
 def show_phone_command(args, book):
     name = args[0]
     record = book.find(name)
     if record and record.phones:
-        return f"{name}'s phone: {record.phones[0]}"
+        return f"{name}'s phone: {next(iter(record.phones))}"
     else:
         return "Contact not found or phone not specified."
-@input_error
 def show_all_command(args, book):
     """Creating output rich styles for the "all" command"""
-    table = Table(show_header=True, header_style="bold yellow")
-    table.add_column("Name", style="bold bright_blue")
-    table.add_column("Phone", style="bold white")
-    table.add_column("Email", style="bold bright_blue")
-    table.add_column("Address", style="bold white")
-    table.add_column("Birthday", style="bold bright_blue")
-    table.add_column("Notes", style="bold white")
-    table.add_column("Tags", style="bold bright_blue")
-    for name, record in book.data.items():
-        phones_str = '; '.join(str(p) for p in record.phones)
-        email_str = str(record.email) if record.email else "Not specified"
-        address_str = str(record.address) if record.address else "Not specified"
-        birthday_str = str(record.birthday) if record.birthday else "Not specified"
-        notes_str = record.show_notes()
-        tags_str = record.show_tags()
-        table.add_row(name, phones_str, email_str, address_str, birthday_str, notes_str, tags_str)
-    console.print(table)
-@input_error
+    # The table is kept on the book and only rebuilt after the book changes
+    if book._all_table is None:
+        from rich.table import Table
+        table = Table(show_header=True, header_style="bold yellow")
+        table.add_column("Name", style="bold bright_blue")
+        table.add_column("Phone", style="bold white")
+        table.add_column("Email", style="bold bright_blue")
+        table.add_column("Address", style="bold white")
+        table.add_column("Birthday", style="bold bright_blue")
+        table.add_column("Notes", style="bold white")
+        table.add_column("Tags", style="bold bright_blue")
+        for record in book.data.values():
+            table.add_row(*record._display())
+        book._all_table = table
+    get_console().print(book._all_table)
 def add_birthday_command(args, book):
     name, birthday = args
     record = book.find(name)
@@ -319,7 +629,6 @@ def add_birthday_command(args, book):
         return "Birthday added."
     else:
         return "Contact not found."
-@input_error
 def show_birthday_command(args, book):
     name = args[0]
     record = book.find(name)
@@ -327,14 +636,12 @@ def show_birthday_command(args, book):
         return f"{name}'s birthday: {record.birthday}"
     else:
         return "Contact not found or birthday not specified."
-@input_error
 def birthdays_command(args, book):
     upcoming_birthdays = book.get_birthdays_per_week()
     if upcoming_birthdays:
         return f"Upcoming birthdays: {', '.join(upcoming_birthdays)}"
     else:
         return "No upcoming birthdays."
-@input_error
 def show_notes_command(args, book):
     name = args[0]
     record = book.find(name)
@@ -342,7 +649,6 @@ def show_notes_command(args, book):
         return f"{name}'s notes: {record.show_notes()}"
     else:
         return "Contact not found or notes not specified."
-@input_error
 def add_notes_command(args, book):
     name, notes = args
     record = book.find(name)
@@ -351,7 +657,6 @@ def add_notes_command(args, book):
         return "Notes added."
     else:
         return "Contact not found."
-@input_error
 def add_tag_command(args, book):
     name, tag = args
     record = book.find(name)
@@ -361,7 +666,6 @@ def add_tag_command(args, book):
     else:
         return "Contact not found."
  
-@input_error
 def show_tags_command(args, book):
     name = args[0]
     record = book.find(name)
@@ -369,19 +673,43 @@ def show_tags_command(args, book):
         return f"{name}'s tags: {record.show_tags()}"
     else:
         return "Contact not found or tags not specified."
+def find_by_phone_command(args, book):
+    phone = args[0]
+    record = book.find_by_phone(phone)
+    return f"Contact found: {record}" if record else "Contact not found."
+def find_by_email_command(args, book):
+    email = args[0]
+    record = book.find_by_email(email)
+    return f"Contact found: {record}" if record else "Contact not found."
+def hello_command(args, book):
+    return "How can I help you?"
+def save_command(args, book):
+    filename = args[0] if args else input("Enter the filename to save: ")
+    book.save_to_file(filename)
+    return "Address book saved."
+def load_command(args, book):
+    filename = args[0] if args else input("Enter the filename to load: ")
+    book.load_from_file(filename)
+    return "Address book loaded."
+def get_console():
+    """Returns the shared Console, importing rich the first time output is needed"""
+    global _console
+    if _console is None:
+        from rich.console import Console
+        _console = Console()
+    return _console
 def rich_print(*args, **kwargs):
     """Sets the "bold bright_blue" style for output if no other style has been specified"""
     kwargs.setdefault("style", "bold bright_blue")
-    console.print(*args, **kwargs)
+    get_console().print(*args, **kwargs)
     
-@input_error
 def rich_input(prompt):
     """Sets the "bold yellow" style for input if no other style has been specified"""
-    console.print(prompt, end="", style="bold yellow")
+    get_console().print(prompt, end="", style="bold yellow")
     return input()
-def show_help_command():
-    """Initialize the console and table"""
-    console = Console()
+def _build_help_table():
+    """Initialize the help table; built on the first help command and reused afterwards"""
+    from rich.table import Table
     table = Table(show_header=True, header_style="bold dark_blue")
     # Define the columns for the table
     table.add_column("Command", justify="left")
@@ -397,7 +725,7 @@ def show_help_command():
         ("add-birthday <name> <birthday>", "Adds a birthday to the specified contact", "add-birthday John 01.01.1990"),
         ("show-birthday <name>", "Shows the birthday of the specified contact", "show-birthday John"),
         ("birthdays", "Lists upcoming birthdays within the next week", "birthdays"),
-        ("add-notes <name> <notes>", "Adds notes to the specified contact", "add-notes John Note1"),
+        ("add-notes <name> <notes>", "Adds notes to the specified contact", 'add-notes John "Call back on Monday"'),
         ("show-notes <name>", "Shows the notes of the specified contact", "show-notes John"),
         ("add-tag <name> <tag>", "Adds a tag to the specified contact", "add-tag John friend"),
         ("show-tags <name>", "Shows the tags of the specified contact", "show-tags John"),
@@ -415,80 +743,89 @@ def show_help_command():
     # Fill the table with the commands and their descriptions
     for command, description, example in commands:
         table.add_row(command, description, example)
-    # Print the table to the console
-    console.print(table)
+    return table
+_help_table = None
+def show_help_command():
+    global _help_table
+    if _help_table is None:
+        _help_table = _build_help_table()
+    get_console().print(_help_table)
+# Maps each command to its handler, the style its result is printed with, the
+# accepted argument count range and the usage shown when the count is off. Commands
+# that take a fixed set of words need exactly that many; those that read only their
+# leading words have no upper bound (None) and ignore the rest, as they always have;
+# exit, help and all stay in main() since they end the loop or print their own table
+COMMANDS = {
+    "hello": (hello_command, "bold bright_blue", 0, None, "hello"),
+    "add": (add_contact_command, "bold white", 2, 2, "add <name> <phone>"),
+    "change": (change_contact_command, "bold bright_blue", 2, 2, "change <name> <new phone>"),
+    "search-by-tag": (search_by_tag_command, "bold bright_blue", 1, None, "search-by-tag <tag>"),
+    "sort-by-tags": (sort_by_tags_command, "bold bright_blue", 1, None, "sort-by-tags <tag>"),
+    "phone": (show_phone_command, "bold bright_blue", 1, None, "phone <name>"),
+    "find-by-phone": (find_by_phone_command, "bold bright_blue", 1, None, "find-by-phone <phone>"),
+    "find-by-email": (find_by_email_command, "bold bright_blue", 1, None, "find-by-email <email>"),
+    "add-birthday": (add_birthday_command, "bold white", 2, 2, "add-birthday <name> <birthday>"),
+    "show-birthday": (show_birthday_command, "bold white", 1, None, "show-birthday <name>"),
+    "birthdays": (birthdays_command, "bold white", 0, None, "birthdays"),
+    "notes": (show_notes_command, "bold bright_blue", 1, None, "notes <name>"),
+    "add-notes": (add_notes_command, "bold bright_blue", 2, 2, "add-notes <name> <notes>"),
+    "add-tag": (add_tag_command, "bold bright_blue", 2, 2, "add-tag <name> <tag>"),
+    "show-tags": (show_tags_command, "bold bright_blue", 1, None, "show-tags <name>"),
+    "delete-contact": (delete_contact_command, "bold bright_blue", 1, None, "delete-contact <name>"),
+    "delete-email": (delete_email_command, "bold bright_blue", 1, None, "delete-email <name>"),
+    "delete-address": (delete_address_command, "bold bright_blue", 1, None, "delete-address <name>"),
+    "delete-phone": (delete_phone_command, "bold bright_blue", 2, 2, "delete-phone <name> <phone>"),
+    "delete-birthday": (delete_birthday_command, "bold bright_blue", 1, None, "delete-birthday <name>"),
+    "delete-all-tags": (delete_all_tags_command, "bold bright_blue", 1, None, "delete-all-tags <name>"),
+    "save": (save_command, "bold bright_blue", 0, None, "save [filename]"),
+    "load": (load_command, "bold bright_blue", 0, None, "load [filename]"),
+}
+# Interned keys let the per-command lookup match parsed names by identity
+COMMANDS = {sys.intern(command): entry for command, entry in COMMANDS.items()}
 def parse_input(user_input):
-    cmd, *args = user_input.split()
-    cmd = cmd.strip().lower()
-    return cmd, args
+    # Quoted arguments such as add-notes John "call back later" go through shlex;
+    # it is pure Python, so unquoted input stays on str.split and never imports it
+    parts = None
+    if '"' in user_input:
+        import shlex
+        lexer = shlex.shlex(user_input, posix=True)
+        lexer.whitespace_split = True
+        lexer.quotes = '"'  # only double quotes group words: O'Brien keeps its apostrophe,
+        lexer.escape = ''  # backslashes stay as typed
+        lexer.commenters = ''  # and # starts no comment
+        try:
+            parts = list(lexer)
+        except ValueError:  # unbalanced quote, treat it as an ordinary character
+            pass
+    if parts is None:
+        parts = user_input.split()
+    if not parts:
+        return "", []
+    return sys.intern(parts[0].lower()), parts[1:]
 def main():
     book = AddressBook()
     rich_print("Welcome to the assistant bot!")
     while True:
         user_input = rich_input("Enter a command: ")
         command, args = parse_input(user_input)
-        if command in ["close", "exit"]:
+        entry = COMMANDS.get(command)
+        if entry:
+            handler, style, min_args, max_args, usage = entry
+            if len(args) < min_args or (max_args is not None and len(args) > max_args):
+                result = f"Invalid command or missing argument. Usage: {usage}"
+            else:
+                try:
+                    result = handler(args, book)
+                except ValueError as e:  # rejected by the Phone/Email/Birthday validators
+                    result = str(e)
+            rich_print(result, style=style)
+        elif command in ["close", "exit"]:
             rich_print("Goodbye!", style="bold white")
             break
         elif command == "help":
             show_help_command()
-        elif command == "hello":
-            rich_print("How can I help you?")
-        elif command == "add":
-            rich_print(add_contact_command(args, book), style="bold white")
-        elif command == "change":
-            rich_print(change_contact_command(args, book))
-        elif command == "search-by-tag":
-            rich_print(search_by_tag_command(args, book))
-        elif command == "sort-by-tags":
-            rich_print(sort_by_tags_command(args, book))
-        elif command == "phone":
-            rich_print(show_phone_command(args, book))
-        elif command == "find-by-phone":
-            phone = args[0]
-            record = book.find_by_phone(phone)
-            rich_print(f"Contact found: {record}" if record else "Contact not found.")
-        elif command == "find-by-email":
-            email = args[0]
-            record = book.find_by_email(email)
-            rich_print(f"Contact found: {record}" if record else "Contact not found.")        
         elif command == "all":
-            print(show_all_command(args, book))
-            rich_print(show_all_command(args, book))
-        elif command == "add-birthday":
-            rich_print(add_birthday_command(args, book), style="bold white")
-        elif command == "show-birthday":
-            rich_print(show_birthday_command(args, book), style="bold white")
-        elif command == "birthdays":
-            rich_print(birthdays_command(args, book), style="bold white")
-        elif command == "notes":
-            rich_print(show_notes_command(args, book))
-        elif command == "add-notes":
-            rich_print(add_notes_command(args, book))
-        elif command == "add-tag":
-            rich_print(add_tag_command(args, book))
-        elif command == "show-tags":
-            rich_print(show_tags_command(args, book))
-        elif command == "delete-contact":
-            rich_print(delete_contact_command(args, book))
-        elif command == "delete-email":
-            rich_print(delete_email_command(args, book))
-        elif command == "delete-address":
-            rich_print(delete_address_command(args, book))
-        elif command == "delete-phone":
-            rich_print(delete_phone_command(args, book))
-        elif command == "delete-birthday":
-            rich_print(delete_birthday_command(args, book))
-        elif command == "delete-all-tags":
-            rich_print(delete_all_tags_command(args, book))
-        elif command == "save":
-            filename = input("Enter the filename to save: ")
-            book.save_to_file(filename)
-            rich_print("Address book saved.")
-        elif command == "load":
-            filename = input("Enter the filename to load: ")
-            book.load_from_file(filename)
-            rich_print("Address book loaded.")
+            show_all_command(args, book)
         else:
             rich_print("Invalid command.")
 if __name__ == "__main__":